@@ -1,7 +1,12 @@
+import argparse
+import csv
+import json
 import pickle
+import sys
 from functools import wraps
-from collections import UserDict
-from datetime import datetime, date, timedelta
+from itertools import chain
+from calendar import isleap, monthrange
+from datetime import date, timedelta
 from abc import ABC, abstractmethod
 
 
@@ -19,6 +24,10 @@ class UserDisplay(ABC):
     def show_message(self, message):
         pass
 
+    @abstractmethod
+    def show_lines(self, lines):
+        pass
+
     @abstractmethod
     def show_error(self, error_message):
         pass
@@ -27,24 +36,28 @@ class UserDisplay(ABC):
 class ConsoleDisplay(UserDisplay):
 
     def show_contact(self, record):
-        print(
-            f"Contact name: {record.name.value}, phones: {'; '.join(p.value for p in record.phones)}, birthday: {record.birthday}.")
+        print(record.format_line())
 
     def show_all_contacts(self, records):
         if records:
-            for record in records.values():
-                self.show_contact(record)
+            self.show_lines(record.format_line() for record in records.values())
         else:
             print("No contacts found.")
 
     def show_message(self, message):
         print(message)
 
+    def show_lines(self, lines):
+        sys.stdout.write('\n'.join(lines))
+        sys.stdout.write('\n')
+
     def show_error(self, error_message):
         print(f"Error: {error_message}")
 
 
 class Field:
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -52,97 +65,251 @@ class Field:
         return str(self.value)
 
 
-class Name(Field):
-    pass
-
-
 class Phone(Field):
+    __slots__ = ()
+    ERROR_MESSAGE = "Phone must be 10 digits."
+
     def __init__(self, value):
-        if value.isdigit() and len(value) == 10:
+        if self.is_valid(value):
             super().__init__(value)
         else:
-            raise ValueError("Phone must be 10 digits.")
+            raise ValueError(self.ERROR_MESSAGE)
+
+    @staticmethod
+    def is_valid(value):
+        return isinstance(value, str) and len(value) == 10 and value.isascii() and value.isdigit()
+
+    @classmethod
+    def try_parse(cls, value):
+        return cls(value) if cls.is_valid(value) else None
 
 
 class Birthday(Field):
+    __slots__ = ('date', 'mmdd')
+    ERROR_MESSAGE = "Invalid date format. Use DD.MM.YYYY."
+
     def __init__(self, value):
-        try:
-            datetime.strptime(value, '%d.%m.%Y')
-            super().__init__(value)
-        except ValueError:
-            raise ValueError("Invalid date format. Use DD.MM.YYYY.")
+        birthday_date = self.parse(value)
+        if birthday_date is None:
+            raise ValueError(self.ERROR_MESSAGE)
+        self._set(value, birthday_date)
+
+    @classmethod
+    def _from_date(cls, value, birthday_date):
+        # value must be the string birthday_date was parsed from
+        birthday = cls.__new__(cls)
+        birthday._set(value, birthday_date)
+        return birthday
+
+    def _set(self, value, birthday_date):
+        super().__init__(value)
+        self.date = birthday_date
+        self.mmdd = birthday_date.month * 100 + birthday_date.day
+
+    @staticmethod
+    def parse(value):
+        if not isinstance(value, str):
+            return None
+        parts = value.split('.')
+        if len(parts) != 3 or not all(part.isascii() and part.isdigit() for part in parts):
+            return None
+        # Same widths strptime('%d.%m.%Y') accepts
+        if not (1 <= len(parts[0]) <= 2 and 1 <= len(parts[1]) <= 2 and len(parts[2]) == 4):
+            return None
+        day, month, year = map(int, parts)
+        if year < 1 or not 1 <= month <= 12 or not 1 <= day <= monthrange(year, month)[1]:
+            return None
+        return date(year, month, day)
+
+    @classmethod
+    def try_parse(cls, value):
+        birthday_date = cls.parse(value)
+        return cls._from_date(value, birthday_date) if birthday_date else None
 
 
 class Record:
+    __slots__ = ('name', '_phones', '_phones_str_cache', 'birthday', '_book')
+
     def __init__(self, name):
-        self.name = Name(name)
-        self.phones = []
+        self.name = name
+        # phone number -> Phone, insertion ordered
+        self._phones = {}
+        self._phones_str_cache = None
         self.birthday = None
+        self._book = None
 
-    def add_phone(self, phone_number: str):
-        phone = Phone(phone_number)
-        self.phones.append(phone)
+    @property
+    def phones(self):
+        return list(self._phones.values())
+
+    def add_phone(self, phone_number: str | Phone):
+        phone = phone_number if isinstance(phone_number, Phone) else Phone(phone_number)
+        self._phones[phone.value] = phone
+        self._phones_str_cache = None
 
     def remove_phone(self, phone_number: str):
-        phone = self.find_phone(phone_number)
-        self.phones.remove(phone)
-
-    def edit_phone(self, old_number: str, new_number: str):
-        phone = self.find_phone(old_number)
-        if phone:
-            self.add_phone(new_number)
-            self.remove_phone(old_number)
-        else:
+        if self._phones.pop(phone_number, None) is None:
+            raise ValueError(f"Phone number {phone_number} not found.")
+        self._phones_str_cache = None
+
+    def edit_phone(self, old_number: str, new_number: str | Phone):
+        new_phone = new_number if isinstance(new_number, Phone) else Phone(new_number)
+        if self._phones.pop(old_number, None) is None:
             raise ValueError(f"Phone number {old_number} not found.")
+        self._phones[new_phone.value] = new_phone
+        self._phones_str_cache = None
 
     def find_phone(self, phone_number: str):
-        for phone in self.phones:
-            if phone.value == phone_number:
-                return phone
-        return None
+        return self._phones.get(phone_number)
 
-    def add_birthday(self, new_birthday):
-        birthday = Birthday(new_birthday)
+    def add_birthday(self, new_birthday: str | Birthday):
+        birthday = new_birthday if isinstance(new_birthday, Birthday) else Birthday(new_birthday)
+        if self._book is not None:
+            self._book._unindex_birthday(self)
         self.birthday = birthday
+        if self._book is not None:
+            self._book._index_birthday(self)
 
-    def __str__(self):
-        return f"Contact name: {self.name.value}, phones: {'; '.join(p.value for p in self.phones)}, birthday: {self.birthday}."
+    def phones_str(self):
+        if self._phones_str_cache is None:
+            self._phones_str_cache = '; '.join(self._phones)
+        return self._phones_str_cache
 
+    def format_line(self):
+        return f"Contact name: {self.name}, phones: {self.phones_str()}, birthday: {self.birthday}."
+
+    def __str__(self):
+        return self.format_line()
+
+    def __getstate__(self):
+        state = {slot: getattr(self, slot) for slot in self.__slots__}
+        # The owning book re-attaches itself on load
+        state['_book'] = None
+        return state
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+
+class AddressBook(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._rebuild_birthday_index()
+
+    def __reduce__(self):
+        # Only the records are pickled; the birthday index is rebuilt by __init__
+        return self.__class__, (dict(self),)
+
+    # Every dict mutation goes through these so the birthday index stays in sync
+    def __setitem__(self, name, record):
+        old_record = self.get(name)
+        if old_record is not None:
+            self._detach(old_record)
+        super().__setitem__(name, record)
+        record._book = self
+        self._index_birthday(record)
+
+    def __delitem__(self, name):
+        self._detach(self[name])
+        super().__delitem__(name)
+
+    def pop(self, name, *default):
+        if name in self:
+            self._detach(self[name])
+        return super().pop(name, *default)
+
+    def popitem(self):
+        name, record = super().popitem()
+        self._detach(record)
+        return name, record
+
+    def setdefault(self, name, record):
+        if name not in self:
+            self[name] = record
+        return self[name]
+
+    def update(self, *args, **kwargs):
+        for name, record in dict(*args, **kwargs).items():
+            self[name] = record
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        for record in self.values():
+            record._book = None
+        super().clear()
+        self._by_md = {}
 
-class AddressBook(UserDict):
     def add_record(self, record):
-        self.data[record.name.value] = record
+        self[record.name] = record
 
     def find(self, name):
-        return self.data.get(name)
+        return self.get(name)
 
     def delete(self, name):
-        if name in self.data:
-            del self.data[name]
+        self.pop(name, None)
+
+    def bulk_add(self, rows):
+        imported = skipped = 0
+        for name, phone_number, birthday_value in rows:
+            if not name:
+                skipped += 1
+                continue
+            phone = Phone.try_parse(phone_number) if phone_number else None
+            birthday = Birthday.try_parse(birthday_value) if birthday_value else None
+            if (phone_number and phone is None) or (birthday_value and birthday is None):
+                skipped += 1
+                continue
+
+            record = self.get(name)
+            if record is None:
+                record = Record(name)
+                self.add_record(record)
+            if phone:
+                record.add_phone(phone)
+            if birthday:
+                record.add_birthday(birthday)
+            imported += 1
+        return imported, skipped
+
+    def _detach(self, record):
+        self._unindex_birthday(record)
+        record._book = None
+
+    def _rebuild_birthday_index(self):
+        # Birthday.mmdd -> records, so birthday lookups only touch the query window
+        self._by_md = {}
+        for record in self.values():
+            record._book = self
+            self._index_birthday(record)
+
+    def _index_birthday(self, record):
+        if record.birthday:
+            self._by_md.setdefault(record.birthday.mmdd, []).append(record)
+
+    def _unindex_birthday(self, record):
+        if record.birthday:
+            key = record.birthday.mmdd
+            bucket = self._by_md.get(key, [])
+            if record in bucket:
+                bucket.remove(record)
+                if not bucket:
+                    del self._by_md[key]
 
     def get_upcoming_birthdays(self, days=7):
         upcoming_birthdays = []
-        today = date.today()
-
-        for record in self.data.values():
-            if record.birthday:
-                birthday_date = datetime.strptime(record.birthday.value, '%d.%m.%Y').date()
-                birthday_this_year = birthday_date.replace(year=today.year)
-
-                if birthday_this_year < today:
-                    birthday_this_year = birthday_date.replace(year=today.year + 1)
-
-                days_until_birthday = (birthday_this_year - today).days
 
-                if 0 <= days_until_birthday <= days:
-                    congratulation_date = adjust_for_weekend(birthday_this_year)
-                    upcoming_birthdays.append(
-                        {"name": record.name.value, "congratulation_date": congratulation_date.strftime('%d.%m.%Y')})
+        for key, congratulation_date in birthday_window(date.today(), days).items():
+            for record in self._by_md.get(key, ()):
+                upcoming_birthdays.append({"name": record.name, "congratulation_date": congratulation_date})
 
         return upcoming_birthdays
 
     def __str__(self):
-        return "\n".join(str(record) for record in self.data.values())
+        return "\n".join(str(record) for record in self.values())
 
 
 def find_next_weekday(start_date, weekday):
@@ -158,6 +325,20 @@ def adjust_for_weekend(birthday):
     return birthday
 
 
+def birthday_window(start_date, days):
+    window = {}
+    for offset in range(days + 1):
+        day = start_date + timedelta(days=offset)
+        congratulation_date = adjust_for_weekend(day).strftime('%d.%m.%Y')
+        mmdd = day.month * 100 + day.day
+        # Windows of a year or more repeat days; keep the nearest occurrence
+        window.setdefault(mmdd, congratulation_date)
+        # Feb 29 birthdays are celebrated on Mar 1 in non-leap years
+        if mmdd == 301 and not isleap(day.year):
+            window.setdefault(229, congratulation_date)
+    return window
+
+
 # Error handler
 def input_error(func):
     @wraps(func)
@@ -175,55 +356,195 @@ def input_error(func):
 
 
 def parse_input(user_input):
-    cmd, *args = user_input.split()
-    cmd = cmd.strip().lower()
-    return cmd, *args
+    cmd, *rest = user_input.split(maxsplit=1) or ['']
+    return cmd.lower(), rest[0].split() if rest else []
 
 
 # Saving data
-def save_data(book, filename='addressbook.pkl'):
-    with open(filename, 'wb') as f:
-        pickle.dump(book, f)
+IO_BUFFER_SIZE = 1 << 20
+
+
+def save_data(book, filename='addressbook.json'):
+    contacts = [
+        {
+            "name": record.name,
+            "phones": [phone.value for phone in record.phones],
+            "birthday": record.birthday.value if record.birthday else None,
+        }
+        for record in book.values()
+    ]
+    with open(filename, 'w', encoding='utf-8', buffering=IO_BUFFER_SIZE) as f:
+        f.write(json.dumps(contacts, ensure_ascii=False))
 
 
-def load_data(filename='addressbook.pkl'):
+def load_data(display: UserDisplay, filename='addressbook.json', legacy_filename='addressbook.pkl'):
     try:
-        with open(filename, 'rb') as f:
-            return pickle.load(f)
+        with open(filename, encoding='utf-8', buffering=IO_BUFFER_SIZE) as f:
+            contacts = json.load(f)
+    except FileNotFoundError:
+        return migrate_legacy_data(display, legacy_filename, filename)
+    if not isinstance(contacts, list):
+        raise ValueError(f"{filename} does not contain a list of contacts")
+
+    book = AddressBook()
+    _, skipped = book.bulk_add(_json_rows(contacts))
+    if skipped:
+        display.show_error(f"Skipped {skipped} invalid entries in {filename}.")
+    return book
+
+
+def _json_rows(contacts):
+    for contact in contacts:
+        if not isinstance(contact, dict) or not isinstance(contact.get("name"), str):
+            # Counted as skipped by bulk_add
+            yield None, None, None
+            continue
+        phone_numbers = contact.get("phones")
+        if not isinstance(phone_numbers, list):
+            phone_numbers = []
+        yield from _contact_rows(contact["name"], phone_numbers, contact.get("birthday"))
+
+
+def migrate_legacy_data(display: UserDisplay, legacy_filename, filename):
+    try:
+        book, skipped = load_legacy_data(legacy_filename)
     except FileNotFoundError:
         return AddressBook()
+    except Exception as e:
+        # Unpickling can fail in many ways; report all of them as unreadable data
+        raise ValueError(f"cannot read {legacy_filename}: {e}") from e
+
+    save_data(book, filename)
+    display.show_message(f"Converted {legacy_filename} to {filename}; the old file was left in place.")
+    if skipped:
+        display.show_error(f"Skipped {skipped} invalid entries in {legacy_filename}.")
+    return book
+
+
+def _contact_rows(name, phone_numbers, birthday_value):
+    # One bulk_add row per value, so a bad phone or date only drops that value
+    yield name, None, None
+    for phone_number in phone_numbers:
+        yield name, phone_number, None
+    if birthday_value:
+        yield name, None, birthday_value
+
+
+class _LegacyObject:
+    # Stand-in for the pickled classes; keeps only their attributes
+    def __init__(self, data=None):
+        if data is not None:
+            self.data = data
+
+    def __setitem__(self, key, value):
+        # dict-based books restore their items this way
+        self.__dict__.setdefault('data', {})[key] = value
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            # (dict, slots) state of slotted classes
+            dict_state, slots_state = state
+            state = {**(dict_state or {}), **(slots_state or {})}
+        self.__dict__.update(state)
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    # Only the address book classes and datetime.date may be loaded
+    LEGACY_CLASSES = {'AddressBook', 'Record', 'Field', 'Name', 'Phone', 'Birthday'}
+
+    def find_class(self, module, name):
+        if module in ('__main__', 'main') and name in self.LEGACY_CLASSES:
+            return _LegacyObject
+        if (module, name) == ('datetime', 'date'):
+            return date
+        raise pickle.UnpicklingError(f"global '{module}.{name}' is forbidden")
+
+
+def _legacy_contacts(legacy_book):
+    for record in legacy_book.data.values():
+        name = getattr(record.name, 'value', record.name)
+        if hasattr(record, '_phones'):
+            phone_numbers = list(record._phones)
+        else:
+            phone_numbers = [phone.value for phone in record.phones]
+        birthday_value = record.birthday.value if record.birthday else None
+        yield name, phone_numbers, birthday_value
+
+
+def load_legacy_data(filename='addressbook.pkl'):
+    with open(filename, 'rb', buffering=IO_BUFFER_SIZE) as f:
+        legacy_book = _LegacyUnpickler(f).load()
+    book = AddressBook()
+    skipped = 0
+    for name, phone_numbers, birthday_value in _legacy_contacts(legacy_book):
+        skipped += book.bulk_add(_contact_rows(name, phone_numbers, birthday_value))[1]
+    return book, skipped
+
+
+# Bulk import
+CSV_HEADER = ['name', 'phone', 'birthday']
+
+
+def _is_csv_header(row):
+    cells = [cell.lower() for cell in row if cell]
+    return cells == CSV_HEADER[:len(cells)]
+
+
+def import_contacts(filename, book):
+    with open(filename, newline='', encoding='utf-8-sig') as f:
+        rows = ([cell.strip() for cell in row] + ['', ''] for row in csv.reader(f))
+        rows = (row[:3] for row in rows if any(row))
+        first_row = next(rows, None)
+        if first_row is not None and not _is_csv_header(first_row):
+            rows = chain([first_row], rows)
+        return book.bulk_add(rows)
 
 
 # User interaction functions
-@input_error
 def add_contact(args, book: AddressBook, display: UserDisplay):
-    name, phone, *_ = args
+    if len(args) < 2:
+        display.show_error("Enter name and phone please.")
+        return
+    name, phone_number, *_ = args
+    phone = Phone.try_parse(phone_number)
+    if phone is None:
+        display.show_error(Phone.ERROR_MESSAGE)
+        return
     record = book.find(name)
     message = "Contact updated."
     if record is None:
         record = Record(name)
         book.add_record(record)
         message = "Contact added."
-    if phone:
-        record.add_phone(phone)
+    record.add_phone(phone)
     display.show_message(message)
 
 
-@input_error
 def change_contact(args, book: AddressBook, display: UserDisplay):
-    name, old_phone, new_phone = args
+    if len(args) != 3:
+        display.show_error("Enter name, old phone and new phone please.")
+        return
+    name, old_phone, new_phone_number = args
     record = book.find(name)
-    if record:
-        record.edit_phone(old_phone, new_phone)
-        display.show_message("Contact changed.")
-    else:
+    if record is None:
         display.show_error("Contact not found.")
+        return
+    if record.find_phone(old_phone) is None:
+        display.show_error(f"Phone number {old_phone} not found.")
+        return
+    new_phone = Phone.try_parse(new_phone_number)
+    if new_phone is None:
+        display.show_error(Phone.ERROR_MESSAGE)
+        return
+    record.edit_phone(old_phone, new_phone)
+    display.show_message("Contact changed.")
 
 
-@input_error
 def show_phone_num(args, book: AddressBook, display: UserDisplay):
-    name = args[0]
-    record = book.find(name)
+    if not args:
+        display.show_error("Please enter username.")
+        return
+    record = book.find(args[0])
     if record:
         display.show_message(', '.join(phone.value for phone in record.phones))
     else:
@@ -231,78 +552,105 @@ def show_phone_num(args, book: AddressBook, display: UserDisplay):
 
 
 def show_contacts(book: AddressBook, display: UserDisplay):
-    display.show_all_contacts(book.data)
+    display.show_all_contacts(book)
 
 
-@input_error
 def add_birthday(args, book: AddressBook, display: UserDisplay):
-    name, birthday, *_ = args
+    if len(args) < 2:
+        display.show_error("Enter name and birthday please.")
+        return
+    name, birthday_value, *_ = args
     record = book.find(name)
-    if record:
-        record.add_birthday(birthday)
-        display.show_message("Birthday added.")
-    else:
+    if record is None:
         display.show_error("Contact not found.")
+        return
+    birthday = Birthday.try_parse(birthday_value)
+    if birthday is None:
+        display.show_error(Birthday.ERROR_MESSAGE)
+        return
+    record.add_birthday(birthday)
+    display.show_message("Birthday added.")
 
 
-@input_error
 def show_birthday(args, book: AddressBook, display: UserDisplay):
-    name = args[0]
-    record = book.find(name)
+    if not args:
+        display.show_error("Please enter username.")
+        return
+    record = book.find(args[0])
     if record and record.birthday:
         display.show_message(record.birthday.value)
     else:
         display.show_error("No birthday found for this contact.")
 
 
-@input_error
 def birthdays(book: AddressBook, display: UserDisplay):
     upcoming_birthdays = book.get_upcoming_birthdays()
     if not upcoming_birthdays:
         display.show_message("No birthdays in the next 7 days.")
     else:
-        display.show_message("\n".join(f"{b['name']}: {b['congratulation_date']}" for b in upcoming_birthdays))
+        display.show_lines(f"{b['name']}: {b['congratulation_date']}" for b in upcoming_birthdays)
 
 
-def main():
-    book = load_data()
-    display = ConsoleDisplay()
-
-    print("Welcome to the assistant bot!")
-    while True:
-        user_input = input("Enter a command: ")
-        command, *args = parse_input(user_input)
+EXIT_COMMANDS = {"close", "exit"}
 
-        if command in ["close", "exit"]:
-            display.show_message("Good bye!")
-            break
+COMMANDS = {
+    "hello": lambda book, display, args: display.show_message("How can I help you?"),
+    "add": lambda book, display, args: add_contact(args, book, display),
+    "change": lambda book, display, args: change_contact(args, book, display),
+    "phone": lambda book, display, args: show_phone_num(args, book, display),
+    "all": lambda book, display, args: show_contacts(book, display),
+    "add-birthday": lambda book, display, args: add_birthday(args, book, display),
+    "show-birthday": lambda book, display, args: show_birthday(args, book, display),
+    "birthdays": lambda book, display, args: birthdays(book, display),
+}
 
-        elif command == "hello":
-            display.show_message("How can I help you?")
 
-        elif command == "add":
-            add_contact(args, book, display)
+@input_error
+def run_command(command, args, book: AddressBook, display: UserDisplay):
+    handler = COMMANDS.get(command)
+    if handler:
+        handler(book, display, args)
+    else:
+        print("Invalid command.")
 
-        elif command == "change":
-            change_contact(args, book, display)
 
-        elif command == "phone":
-            show_phone_num(args, book, display)
+def main():
+    parser = argparse.ArgumentParser(description="Assistant bot")
+    parser.add_argument("--import", dest="import_file", metavar="FILE",
+                        help="import contacts from a CSV file (name,phone,birthday; "
+                             "an optional header row is skipped) and exit")
+    cli_args = parser.parse_args()
 
-        elif command == "all":
-            show_contacts(book, display)
+    display = ConsoleDisplay()
+    try:
+        book = load_data(display)
+    except (OSError, ValueError) as e:
+        # Exit without saving so the unreadable file is not overwritten
+        display.show_error(f"Cannot load the address book: {e}")
+        return
 
-        elif command == "add-birthday":
-            add_birthday(args, book, display)
+    if cli_args.import_file:
+        try:
+            imported, skipped = import_contacts(cli_args.import_file, book)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            display.show_error(f"Cannot import {cli_args.import_file}: {e}")
+            return
+        save_data(book)
+        display.show_message(f"Imported {imported} rows, skipped {skipped} invalid rows.")
+        return
 
-        elif command == "show-birthday":
-            show_birthday(args, book, display)
+    print("Welcome to the assistant bot!")
+    while True:
+        user_input = input("Enter a command: ")
+        command, args = parse_input(user_input)
 
-        elif command == "birthdays":
-            birthdays(book, display)
+        if command in EXIT_COMMANDS:
+            display.show_message("Good bye!")
+            break
 
-        else:
-            print("Invalid command.")
+        error_message = run_command(command, args, book, display)
+        if error_message:
+            display.show_error(error_message)
 
     save_data(book)
 